@@ -10,60 +10,94 @@ per the dbus spec).
 NOTE:
 Passing open UNIX filedescriptors accross RPC / ICP mechanisms such as dbus
 requires the underlying transport to be a UNIX domain socket.
+
+DBus unix: addresses are always SOCK_STREAM sockets; neither dbus-daemon nor
+Twisted's UNIX endpoints speak SOCK_SEQPACKET, so the connection made here is
+a plain stream socket. Message framing on the receive side is handled by
+txdbus' protocol buffering, which consumes as many complete messages as each
+read delivers.
 """
 
+import os
 
 from twisted.internet import defer, task
 
 from txdbus import client
 
 
-@defer.inlineCallbacks
-def call_remote_verbose(obj, method, *args, **kwargs):
+PATH = '/path/to/FDObject'
+BUSN = 'org.example'
+
+# A single connection is shared by every call made from this module. The
+# connect / authenticate / Hello round trips are far more expensive than the
+# method calls themselves so they should only be paid once.
+_bus = None
+
+
+async def get_bus(reactor):
+    global _bus
+    if _bus is None:
+        _bus = await client.connect(reactor)
+    return _bus
+
+
+def disconnect_bus():
+    global _bus
+    if _bus is not None:
+        _bus.disconnect()
+        _bus = None
+
+
+async def call_remote_verbose(obj, method, *args, **kwargs):
 
     print(f'calling {method}{args}', end=' = ')
-    result = yield obj.callRemote(method, *args, **kwargs)
+    result = await obj.callRemote(method, *args, **kwargs)
     print(repr(result))
     return result
 
 
-@defer.inlineCallbacks
-def main(reactor):
-
-    PATH = '/path/to/FDObject'
-    BUSN = 'org.example'
+async def main(reactor):
 
     try:
-        bus = yield client.connect(reactor)
+        bus = await get_bus(reactor)
         print('connected to dbus')
-        object = yield bus.getRemoteObject(BUSN, PATH)
+        object = await bus.getRemoteObject(BUSN, PATH)
         print('obtained remote object')
     except Exception as e:
         print(f'failed obtaining remote object: {e}')
         return None
 
-    # Open this source file. Ask remote to read it and return byte count.
-    with open(__file__, 'rb') as f:
-        yield call_remote_verbose(object, 'lenFD', f.fileno())
+    # The calls below are deliberately made one at a time rather than being
+    # issued together and gathered with a DeferredList. Twisted attaches all
+    # queued file descriptors to the first bytes it writes, so if several
+    # FD-carrying calls are buffered at once the bus sees every descriptor
+    # arrive with the first message and drops the connection.
+
+    # This source file is opened once and the same descriptor is passed to
+    # every call. Sending a descriptor over DBus hands the remote a duplicate
+    # of it; the local descriptor stays open and owned by us. The remote reads
+    # regular files positionally, so the shared file offset never moves.
+    fd = os.open(__file__, os.O_RDONLY)
+    try:
+        # Ask remote to read this source file and return byte count.
+        await call_remote_verbose(object, 'lenFD', fd)
 
-    # Open this source file. Ask remote to read 10 bytes from it.
-    with open(__file__, 'rb') as f:
-        yield call_remote_verbose(object, 'readBytesFD', f.fileno(), 10)
+        # Ask remote to read 10 bytes from this source file.
+        await call_remote_verbose(object, 'readBytesFD', fd, 10)
 
-    # Like before, now exercise passing two open UNIX FDs.
-    # (will not be available under Twisted < 17.1.0)
-    with open(__file__, 'rb') as f1, open(__file__, 'rb') as f2:
-        fd1 = f1.fileno()
-        fd2 = f2.fileno()
+        # Like before, now exercise passing two open UNIX FDs.
+        # (will not be available under Twisted < 17.1.0)
         try:
-            yield call_remote_verbose(object, 'readBytesTwoFDs', fd1, fd2, 5)
+            await call_remote_verbose(object, 'readBytesTwoFDs', fd, fd, 5)
         except Exception as e:
             print(f'remote call failed: {e}')
+    finally:
+        os.close(fd)
 
-    bus.disconnect()
+    disconnect_bus()
     print('disconnected')
 
 
 if __name__ == '__main__':
 
-    task.react(main)
+    task.react(lambda reactor: defer.ensureDeferred(main(reactor)))
@@ -14,103 +14,232 @@ requires the underlying transport to be a UNIX domain socket.
 
 
 
+import logging
 import os
+import socket
+import stat
 
-import twisted
+from twisted import version as twistedVersion
 from twisted.internet import defer, reactor
+from twisted.internet.threads import deferToThread
 
 from txdbus import client, interface, objects
 
 
+log = logging.getLogger(__name__)
+
+# Large enough for a multi-megabyte byte array reply to be moved in one go
+SOCKET_BUFFER_SIZE = 4 << 20
+
+
+def _closeFD(fd):
+    """
+    Closes a received file descriptor. Errors are ignored so that a failure
+    to close one descriptor never prevents the others from being closed.
+    """
+    try:
+        os.close(fd)
+    except OSError:
+        pass
+
+
+def _readInto(fd, view):
+    """
+    Fills the writable buffer view from fd, stopping early only at EOF.
+    Returns the number of bytes read.
+
+    Regular files are read from their start with preadv() which leaves the
+    file offset untouched. Received descriptors share their offset with the
+    sender's (and with any other duplicates) so this keeps concurrent reads
+    from interfering with each other. Where preadv() is unavailable, pread()
+    is used and each chunk is copied into the view. Unseekable descriptors
+    such as pipes are read sequentially.
+    """
+    positional = stat.S_ISREG(os.fstat(fd).st_mode)
+    total = 0
+    while total < len(view):
+        if positional:
+            if hasattr(os, 'preadv'):
+                n = os.preadv(fd, [view[total:]], total)
+            else:
+                data = os.pread(fd, len(view) - total, total)
+                n = len(data)
+                view[total:total + n] = data
+        else:
+            n = os.readv(fd, [view[total:]])
+        if n == 0:
+            break
+        total += n
+    return total
+
+
+def _shortRepr(value, limit=64):
+    if isinstance(value, (bytes, bytearray)) and len(value) > limit:
+        return f'{value[:limit]!r}... ({len(value)} bytes)'
+    return repr(value)
+
+
 def trace_method_call(method):
 
     def wrapper(*args, **kwargs):
-        print(f'handling {method.__name__}{args[1:]!r}', end=' = ')
-        result = method(*args, **kwargs)
-        print(repr(result))
-        return result
+        if not log.isEnabledFor(logging.DEBUG):
+            return method(*args, **kwargs)
+
+        log.debug('handling %s%r', method.__name__, args[1:])
+
+        def done(result):
+            log.debug('%s%r = %s', method.__name__, args[1:],
+                      _shortRepr(result))
+            return result
+
+        return defer.maybeDeferred(method, *args, **kwargs).addCallback(done)
 
     return wrapper
 
 
+# Only export 'readBytesTwoFDs' if we're running Twisted >= 17.1.0 which
+# is required to handle multiple UNIX FD arguments.
+
+_minTxVersion = type(twistedVersion)('twisted', 17, 1, 0)
+_hasMultiFD = twistedVersion >= _minTxVersion
+
+_methods = [
+    'org.example.FDInterface',
+    interface.Method('lenFD', arguments='h', returns='t'),
+    interface.Method('readBytesFD', arguments='ht', returns='ay'),
+]
+
+if _hasMultiFD:
+    _methods.append(
+        interface.Method('readBytesTwoFDs', arguments='hht', returns='ay')
+    )
+else:
+    print('Twisted version < {}, not exposing {!r}'.format(
+        _minTxVersion.base(),
+        'readBytesTwoFDs'
+    ))
+
+# Built once at import and shared by every FDObject instance
+_FDInterface = interface.DBusInterface(*_methods)
+
+del _minTxVersion, _methods
+
+
 class FDObject(objects.DBusObject):
 
-    _methods = [
-        'org.example.FDInterface',
-        interface.Method('lenFD', arguments='h', returns='t'),
-        interface.Method('readBytesFD', arguments='ht', returns='ay'),
-    ]
+    # The reads below may block for an arbitrary amount of time (the FD can
+    # be a pipe, a slow disk, etc.) so they are run in the reactor's thread
+    # pool to keep the reactor free to service other DBus traffic.
 
     @trace_method_call
     def dbus_lenFD(self, fd):
         """
-        Returns the byte count after reading till EOF.
+        Returns the byte count of fd. Regular files are sized with fstat(),
+        anything else is read till EOF.
         """
-        f = os.fdopen(fd, 'rb')
-        result = len(f.read())
-        f.close()
+        return deferToThread(self._lenFD, fd)
+
+    def _lenFD(self, fd):
+        result = 0
+        try:
+            st = os.fstat(fd)
+            if stat.S_ISREG(st.st_mode):
+                return st.st_size
+            while True:
+                data = os.read(fd, 65536)
+                if not data:
+                    break
+                result += len(data)
+        finally:
+            _closeFD(fd)
         return result
 
     @trace_method_call
     def dbus_readBytesFD(self, fd, byte_count):
         """
-        Reads byte_count bytes from fd and returns them.
+        Reads the first byte_count bytes from fd and returns them.
         """
-        f = os.fdopen(fd, 'rb')
-        result = f.read(byte_count)
-        f.close()
-        return bytearray(result)
+        return deferToThread(self._readBytesFD, fd, byte_count)
+
+    def _readBytesFD(self, fd, byte_count):
+        # The payload has to pass through Python: the reply is a DBus message
+        # that is marshalled in full and queued on the Twisted transport
+        # behind any other pending output, and it is normally relayed by the
+        # bus daemon rather than written to the caller directly. Splicing the
+        # file into the socket with os.sendfile() would bypass both.
+        # Read straight into the buffer that is handed to the marshaller; no
+        # buffered file object is involved, and no intermediate bytes objects
+        # either unless os.preadv is unavailable (see _readInto).
+        result = bytearray(byte_count)
+        try:
+            with memoryview(result) as view:
+                used = _readInto(fd, view)
+        finally:
+            _closeFD(fd)
+        del result[used:]
+        return result
 
     @trace_method_call
     def dbus_readBytesTwoFDs(self, fd1, fd2, byte_count):
         """
-        Reads byte_count from fd1 and fd2. Returns concatenation.
+        Reads the first byte_count bytes from fd1 and fd2. Returns
+        concatenation.
         """
-        result = bytearray()
-        for fd in (fd1, fd2):
-            f = os.fdopen(fd, 'rb')
-            result.extend(f.read(byte_count))
-            f.close()
+        return deferToThread(self._readBytesTwoFDs, fd1, fd2, byte_count)
+
+    def _readBytesTwoFDs(self, fd1, fd2, byte_count):
+        # Both reads land directly in a single, preallocated buffer. The
+        # second read starts right after the end of the first so a short
+        # read only requires truncating the tail.
+        result = bytearray(2 * byte_count)
+        used = 0
+        try:
+            with memoryview(result) as view:
+                for fd in (fd1, fd2):
+                    used += _readInto(fd, view[used:used + byte_count])
+        finally:
+            _closeFD(fd1)
+            _closeFD(fd2)
+        del result[used:]
         return result
 
-    # Only export 'readBytesTwoFDs' if we're running Twisted >= 17.1.0 which
-    # is required to handle multiple UNIX FD arguments.
+    dbusInterfaces = [_FDInterface]
 
-    _minTxVersion = type(twisted.version)('twisted', 17, 1, 0)
-    if twisted.version >= _minTxVersion:
-        _methods.append(
-            interface.Method('readBytesTwoFDs', arguments='hht', returns='ay')
-        )
-    else:
-        print('Twisted version < {}, not exposing {!r}'.format(
-            _minTxVersion.base(),
-            'readBytesTwoFDs'
-        ))
-    del _minTxVersion
 
-    dbusInterfaces = [interface.DBusInterface(*_methods)]
+def tune_socket_buffers(bus, size=SOCKET_BUFFER_SIZE):
+    """
+    Enlarges the kernel send and receive buffers of the bus connection so
+    that large byte array messages can be moved with few read/write calls.
+    The kernel may clamp the values (see net.core.wmem_max/rmem_max).
+    """
+    sock = bus.transport.getHandle()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, size)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
 
 
-@defer.inlineCallbacks
-def main(reactor):
+async def main(reactor):
 
     PATH = '/path/to/FDObject'
     BUSN = 'org.example'
 
     try:
-        bus = yield client.connect(reactor)
+        bus = await client.connect(reactor)
     except Exception as e:
         print(f'failed connecting to dbus: {e}')
         reactor.stop()
         return None
 
     print('connected to dbus')
+    tune_socket_buffers(bus)
     object = FDObject(PATH)
     bus.exportObject(object)
-    yield bus.requestBusName(BUSN)
+    await bus.requestBusName(BUSN)
     print(f'exported {object.__class__.__name__!r} on {BUSN!r} at {PATH!r}')
 
 
 if __name__ == '__main__':
-    reactor.callWhenRunning(main, reactor)
+    logging.basicConfig(level=logging.DEBUG, format='%(message)s')
+    reactor.callWhenRunning(
+        lambda: defer.ensureDeferred(main(reactor))
+    )
     reactor.run()
@@ -15,6 +15,7 @@ from unittest import SkipTest
 
 import twisted
 from twisted.internet import defer, reactor
+from twisted.internet.protocol import Factory
 
 from txdbus import client, endpoints, error, introspection, objects
 from txdbus.interface import DBusInterface, Method, Property, Signal
@@ -898,6 +899,33 @@ class SignalTester(ServerObjectTester):
 
         return dsig
 
+    def test_arg_rule_match_dict(self):
+        dsig = defer.Deferred()
+
+        def on_signal(result):
+            dsig.callback(result)
+
+        d = self.client_conn.addMatch(
+            on_signal,
+            mtype='signal',
+            sender=self.tst_bus,
+            arg={0: 'Signal arg: MATCH'},
+        )
+
+        def on_proxy(ro):
+            return ro.callRemote('sendSignal', 'MATCH')
+
+        d.addCallback(lambda _: self.get_proxy())
+
+        d.addCallback(on_proxy)
+
+        def check_result(result):
+            self.assertEqual(result.body[0], 'Signal arg: MATCH')
+
+        dsig.addCallback(check_result)
+
+        return dsig
+
     def test_arg_path_rule_match(self):
         dsig = defer.Deferred()
 
@@ -1354,6 +1382,37 @@ class ComplexObjectTester(ServerObjectTester):
         d.addBoth(delay)
         return d
 
+    @defer.inlineCallbacks
+    def test_time_out_without_factory_reactor(self):
+
+        class PlainFactory (Factory):
+            protocol = client.DBusClientConnection
+
+            def __init__(self):
+                self.d = defer.Deferred()
+
+            def _ok(self, proto):
+                self.d.callback(proto)
+
+            def _failed(self, err):
+                self.d.errback(err)
+
+        f = PlainFactory()
+        endpoints.getDBusEnvEndpoints(reactor)[0].connect(f)
+        conn = yield f.d
+
+        try:
+            ro = yield conn.getRemoteObject(self.tst_bus, self.tst_path)
+            try:
+                yield ro.callRemote('testTimeOut', timeout=0.01)
+            except error.TimeOut:
+                pass
+            else:
+                self.fail('Call should have timed out')
+        finally:
+            conn.disconnect()
+            yield delay(None)
+
     def test_time_out_not_needed(self):
 
         def on_proxy(ro):
@@ -1440,6 +1499,26 @@ class ComplexObjectTester(ServerObjectTester):
         d.addCallback(lambda _: self.assertTrue(not x['hit2']))
         return d
 
+    def test_connection_lost_callback_cancels_itself(self):
+        x = {'hit1': False, 'hit2': False}
+
+        def cb1(conn, reason):
+            x['hit1'] = True
+            conn.cancelNotifyOnDisconnect(cb1)
+
+        def cb2(conn, reason):
+            x['hit2'] = True
+
+        self.client_conn.notifyOnDisconnect(cb1)
+        self.client_conn.notifyOnDisconnect(cb2)
+        self.client_conn.disconnect()
+        self.client_conn = None
+
+        d = delay(0.01)
+        d.addCallback(lambda _: self.assertTrue(x['hit1']))
+        d.addCallback(lambda _: self.assertTrue(x['hit2']))
+        return d
+
     def test_connection_lost_with_pending_calls(self):
         x = {'hit': False}
 
@@ -42,8 +42,7 @@ class ClientAuthenticatorTester(unittest.TestCase):
     def send(self, msg):
         self.ca.handleAuthMessage(msg)
 
-    def ae(self, x, y):
-        self.assertEqual(x, y)
+    ae = unittest.TestCase.assertEqual
 
     def are(self, x):
         self.assertEqual(self.reply, x)
@@ -51,6 +50,9 @@ class ClientAuthenticatorTester(unittest.TestCase):
     def test_bad_auth_message(self):
         self.assertRaises(DBusAuthenticationFailed, self.send, b'BAD_LINE')
 
+    def test_non_ascii_auth_message(self):
+        self.assertRaises(DBusAuthenticationFailed, self.send, b'\xff foo')
+
     def test_rejection(self):
         self.ae(self.ca.authMech, b'EXTERNAL')
         self.are(b'AUTH EXTERNAL')
@@ -173,8 +175,7 @@ class BusCookieAuthenticatorTester(unittest.TestCase):
     def setUp(self):
         self.ba = authentication.BusCookieAuthenticator()
 
-    def ae(self, x, y):
-        self.assertEqual(x, y)
+    ae = unittest.TestCase.assertEqual
 
     def ar(self, x):
         self.assertEqual(x, ('REJECTED', None))
@@ -404,10 +405,10 @@ def delay(arg):
 
 
 class AuthTestProtocol(protocol.Protocol):
-    _buffer = b''
     _sent_null = False
 
     def connectionMade(self):
+        self._buffer = bytearray()
         self.disconnect_d = None
         self.disconnect_timeout = None
         self.fail_exit_d = None
@@ -415,11 +416,15 @@ class AuthTestProtocol(protocol.Protocol):
         self.factory._ok(self)
 
     def dataReceived(self, data):
-        lines = (self._buffer + data).split(b'\r\n')
-        self._buffer = lines.pop(-1)
+        buf = self._buffer
+        buf.extend(data)
 
-        for line in lines:
+        idx = buf.find(b'\r\n')
+        while idx >= 0:
+            line = bytes(buf[:idx])
+            del buf[:idx + 2]
             self.gotMessage(line)
+            idx = buf.find(b'\r\n')
 
     def disconnect(self):
         self.transport.loseConnection()
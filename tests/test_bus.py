@@ -0,0 +1,138 @@
+from twisted.trial import unittest
+
+from txdbus import bus, message
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.uniqueName = None
+        self.busNames = {}
+        self.matchRules = set()
+        self.isConnected = True
+        self.sent = []
+
+    def sendMessage(self, msg):
+        self.sent.append(msg)
+
+
+class BusRoutingTester(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = bus.Bus()
+        self.a = FakeConnection()
+        self.b = FakeConnection()
+        self.bus.clientConnected(self.a)
+        self.bus.clientConnected(self.b)
+        self.bus.dbus_AddMatch(
+            "interface='org.example.Foo'",
+            dbusCaller=self.b.uniqueName,
+        )
+
+    def test_method_call_not_matched(self):
+        m = message.MethodCallMessage(
+            '/foo', 'bar', interface='org.example.Foo',
+            destination=self.a.uniqueName,
+        )
+        self.bus.messageReceived(self.b, m)
+        self.assertEqual(self.a.sent, [m])
+        self.assertEqual(self.b.sent, [])
+
+    def test_signal_with_destination(self):
+        m = message.SignalMessage(
+            '/foo', 'bar', 'org.example.Foo',
+            destination=self.a.uniqueName,
+        )
+        self.bus.messageReceived(self.a, m)
+        self.assertEqual(self.a.sent, [m])
+        self.assertEqual(self.b.sent, [m])
+
+    def test_broadcast_signal(self):
+        m = message.SignalMessage('/foo', 'bar', 'org.example.Foo')
+        self.bus.messageReceived(self.a, m)
+        self.assertEqual(self.a.sent, [])
+        self.assertEqual(self.b.sent, [m])
+
+    def test_disconnect_drops_match_rules(self):
+        self.assertEqual(len(self.bus.router._rules), 1)
+        self.b.isConnected = False
+        self.bus.clientDisconnected(self.b)
+        self.assertEqual(self.bus.router._rules, {})
+
+
+class BusIdTester(unittest.TestCase):
+
+    def test_get_id(self):
+        b = bus.Bus()
+        uuid = b.dbus_GetId()
+        self.assertEqual(len(uuid), 32)
+        m = message.MethodReturnMessage(1, body=[uuid], signature='s')
+        self.assertEqual(message.parseMessage(m.rawMessage, []).body, [uuid])
+
+
+class BusNameQueueTester(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = bus.Bus()
+        self.conns = [FakeConnection() for _ in range(3)]
+        for c in self.conns:
+            self.bus.clientConnected(c)
+            self.bus.dbus_RequestName('org.example.Foo', 0x2, c.uniqueName)
+
+    def owners(self):
+        return self.bus.dbus_ListQueuedOwners('org.example.Foo')
+
+    def test_release_promotes_next(self):
+        a, b, c = self.conns
+        self.bus.dbus_ReleaseName('org.example.Foo', a.uniqueName)
+        self.assertEqual(self.owners(), [b.uniqueName, c.uniqueName])
+        self.assertEqual(b.sent[-1].member, 'NameAcquired')
+
+    def test_replace_owner(self):
+        a, b, c = self.conns
+        d = FakeConnection()
+        self.bus.clientConnected(d)
+        self.bus.dbus_RequestName('org.example.Foo', 0x1, a.uniqueName)
+        self.bus.dbus_RequestName('org.example.Foo', 0x2, d.uniqueName)
+        self.assertEqual(
+            self.owners(),
+            [d.uniqueName, b.uniqueName, c.uniqueName],
+        )
+
+    def test_disconnect_queued(self):
+        a, b, c = self.conns
+        b.isConnected = False
+        self.bus.clientDisconnected(b)
+        self.assertEqual(self.owners(), [a.uniqueName, c.uniqueName])
+
+
+class BusProtocolTester(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = bus.Bus()
+        self.proto = bus.BusProtocol()
+        self.proto.factory = self
+        self.proto.guid = 'guid'
+        self.proto._receivedFDs = []
+        self.proto.connectionAuthenticated()
+        self.proto.sendMessage = lambda msg: None
+        self.peer = FakeConnection()
+        self.bus.clientConnected(self.peer)
+
+    def test_forward_after_hello(self):
+        hello = message.MethodCallMessage(
+            '/org/freedesktop/DBus', 'Hello',
+            interface='org.freedesktop.DBus',
+            destination='org.freedesktop.DBus',
+        )
+        self.proto.rawDBusMessageReceived(hello.rawMessage)
+
+        for i in range(2):
+            m = message.MethodCallMessage(
+                '/foo', 'bar', destination=self.peer.uniqueName,
+            )
+            self.proto.rawDBusMessageReceived(m.rawMessage)
+
+        self.assertEqual(len(self.peer.sent), 2)
+        for m in self.peer.sent:
+            self.assertEqual(m.sender, self.proto.uniqueName)
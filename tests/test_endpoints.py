@@ -53,6 +53,11 @@ class EndpointsTester(unittest.TestCase):
         self.assertEqual(e._address, '\0/tmp/dbus-jgAbdgyUH7')
         self.assertTrue(isinstance(e, UNIXServerEndpoint))
 
+    def test_value_containing_equals(self):
+        e = self.gde('unix:path=/tmp/dbus-a=b,guid=1234')[0]
+        self.assertEqual(e._path, '/tmp/dbus-a=b')
+        self.assertEqual(e.dbus_args['guid'], '1234')
+
     def test_tcp_address(self):
         e = self.gde('tcp:host=127.0.0.1,port=1234')[0]
         self.assertEqual(e._host, '127.0.0.1')
@@ -46,6 +46,9 @@ class SigFromPyTests(unittest.TestCase):
     def test_bytearray(self):
         self.t(bytearray(b'\xAA\xAA'), 'ay')
 
+    def test_bytes(self):
+        self.t(b'\xAA\xAA', 'ay')
+
     def test_list_multiple_elements_same_type(self):
         self.t([1, 2], 'ai')
 
@@ -244,6 +247,12 @@ class TestArrayMarshal(TestMarshal):
             pack('iBB', 2, 170, 170),
         )
 
+    def test_byte_bytes(self):
+        self.check('ay', [b'\xaa\xbb'], pack('iBB', 2, 170, 187))
+
+    def test_byte_bytes_big_endian(self):
+        self.check('ay', [b'\xaa\xbb'], pack('>iBB', 2, 170, 187), False)
+
     def test_string(self):
         self.check('as', [['x', 'foo']], pack(
             'ii2sxxi4s', 16, 1, b'x', 3, b'foo'))
@@ -26,3 +26,20 @@ class MessageTester(unittest.TestCase):
             self.assertTrue(False)
         except Exception as e:
             self.assertEqual(str(e), 'Unknown Message Type: 99')
+
+    def test_remarshal_header(self):
+        m = message.MethodCallMessage(
+            '/foo', 'bar', interface='org.foo', destination='org.baz',
+            signature='say', body=['hello', b'\x01\x02\x03'],
+            expectReply=False,
+        )
+        p = message.parseMessage(m.rawMessage, oobFDs=[])
+        p.sender = ':1.42'
+        p._remarshalHeader()
+
+        r = message.parseMessage(p.rawMessage, oobFDs=[])
+        self.assertEqual(r.sender, ':1.42')
+        self.assertEqual(r.serial, m.serial)
+        self.assertEqual(r.body, ['hello', [1, 2, 3]])
+        self.assertEqual(p.rawMessage[2], m.rawMessage[2])
+        self.assertEqual(p.rawBody, m.rawBody)
@@ -1,3 +1,4 @@
+import functools
 import struct
 
 from twisted.trial import unittest
@@ -67,25 +68,25 @@ class Version:
 
 
 class DataType:
-    INVALID = 0
-    BYTE = ord('y')
-    BOOLEAN = ord('b')
-    INT16 = ord('n')
-    UINT16 = ord('q')
-    INT32 = ord('i')
-    UINT32 = ord('u')
-    INT64 = ord('x')
-    UINT64 = ord('t')
-    DOUBLE = ord('d')
-    STRING = ord('s')
-    OBJECT_PATH = ord('o')
-    SIGNATURE = ord('g')
-    ARRAY = ord('a')
-    STRUCT_BEGIN = ord('(')
-    STRUCT_END = ord(')')
-    VARIANT = ord('v')
-    DICT_ENTRY = ord('e')
-    UNIX_FD = ord('h')
+    INVALID = b'\x00'
+    BYTE = b'y'
+    BOOLEAN = b'b'
+    INT16 = b'n'
+    UINT16 = b'q'
+    INT32 = b'i'
+    UINT32 = b'u'
+    INT64 = b'x'
+    UINT64 = b't'
+    DOUBLE = b'd'
+    STRING = b's'
+    OBJECT_PATH = b'o'
+    SIGNATURE = b'g'
+    ARRAY = b'a'
+    STRUCT_BEGIN = b'('
+    STRUCT_END = b')'
+    VARIANT = b'v'
+    DICT_ENTRY = b'e'
+    UNIX_FD = b'h'
 
 
 class HeaderField:
@@ -102,19 +103,69 @@ class HeaderField:
 
 
 def encode_signature(*data_types):
-    data = bytearray(data_types)
-    data.append(0)
-    data.insert(0, len(data_types))
-    return data
+    data = b''.join(data_types)
+    return bytes([len(data)]) + data + b'\x00'
+
+
+# Leading field code and variant signature of each header field used below.
+# Both are constant for a given field, and 4 bytes long so the value that
+# follows needs no further padding.
+PATH_FIELD = (
+    bytes([HeaderField.PATH]) + encode_signature(DataType.OBJECT_PATH))
+MEMBER_FIELD = (
+    bytes([HeaderField.MEMBER]) + encode_signature(DataType.STRING))
+SIGNATURE_FIELD = (
+    bytes([HeaderField.SIGNATURE]) + encode_signature(DataType.SIGNATURE))
+UNIX_FDS_FIELD = (
+    bytes([HeaderField.UNIX_FDS]) + encode_signature(DataType.UINT32))
+
+
+def aligned(offset, boundary):
+    """Returns `offset` rounded up to the next multiple of `boundary`, which
+    must be a power of two (D-Bus only uses alignments of 1, 2, 4 and 8)
+    """
+    return (offset + boundary - 1) & -boundary
 
 
-def align(align, offset):
-    count = offset % align
-    if not count:
-        return b''
-    return b'\x00' * (align - count)
+def string_field_len(value):
+    """Length of a header field holding a STRING or OBJECT_PATH `value`"""
+    # code + signature (4), uint32 length (4), value, terminating nul
+    return 8 + len(value) + 1
 
 
+def pack_string_field(buf, offset, field, value):
+    """Writes a STRING or OBJECT_PATH header field into the zero-filled
+    `buf` at the 8-byte aligned `offset`. `field` is one of the *_FIELD
+    prefixes above
+    """
+    buf[offset:offset + 4] = field
+    struct.pack_into('<I', buf, offset + 4, len(value))
+    buf[offset + 8:offset + 8 + len(value)] = value
+
+
+def pack_message(buf, body_len, serial, headers_len):
+    """Writes the fixed part of a METHOD_CALL message header into `buf`"""
+    struct.pack_into(
+        '<BBBBIII',
+        buf,
+        0,
+        Endian.LITTLE,
+        MsgType.METHOD_CALL,
+        Flags.NONE,
+        Version.ONE,
+        body_len,
+        serial,
+        headers_len,
+    )
+
+
+# The messages below are laid out up front and written into a single
+# zero-filled buffer, so all padding comes for free by advancing offsets.
+# Header field offsets are relative to the start of the header array which
+# itself starts at the (8-byte aligned) offset 16. The results are plain
+# bytes, so identical messages are built once and shared between tests.
+
+@functools.lru_cache(maxsize=256)
 def create_basic_method(path, member):
     """Creates raw D-Bus message` with `path` for method `member having no
     parameters
@@ -123,39 +174,22 @@ def create_basic_method(path, member):
     path = path.encode()
     member = member.encode()
 
-    headers = bytearray()
-    headers.append(HeaderField.PATH)
-    headers += encode_signature(DataType.OBJECT_PATH)
-    headers += align(4, len(headers))
-    headers += struct.pack('<I', len(path))
-    headers += path
-    headers.append(0)
-    headers += align(8, len(headers))
-
-    headers.append(HeaderField.MEMBER)
-    headers += encode_signature(DataType.STRING)
-    headers += align(4, len(headers))
-    headers += struct.pack('<I', len(member))
-    headers += member
-    headers.append(0)
-
-    body = bytearray()
-
-    data = bytearray()
-    data.append(Endian.LITTLE)
-    data.append(MsgType.METHOD_CALL)
-    data.append(Flags.NONE)
-    data.append(Version.ONE)
-    data += struct.pack('<I', len(body))
-    data += struct.pack('<I', serial)
-    data += struct.pack('<I', len(headers))
-    data += headers
-    data += align(8, len(data))
-    data += body
+    path_off = 0
+    member_off = aligned(path_off + string_field_len(path), 8)
+    headers_len = member_off + string_field_len(member)
+
+    body_len = 0
+    body_off = 16 + aligned(headers_len, 8)
+
+    data = bytearray(body_off + body_len)
+    pack_message(data, body_len, serial, headers_len)
+    pack_string_field(data, 16 + path_off, PATH_FIELD, path)
+    pack_string_field(data, 16 + member_off, MEMBER_FIELD, member)
 
     return bytes(data)
 
 
+@functools.lru_cache(maxsize=256)
 def create_one_unix_fd_method(path, member, fd_index):
     """Creates raw D-Bus message` with `path` for method `member having one
     UNIX file descriptor input parameter
@@ -164,52 +198,35 @@ def create_one_unix_fd_method(path, member, fd_index):
     serial = 1
     path = path.encode()
     member = member.encode()
-    signature = bytearray([DataType.UNIX_FD])
+    signature = DataType.UNIX_FD
     num_fds = 1
 
-    headers = bytearray()
-    headers.append(HeaderField.PATH)
-    headers += encode_signature(DataType.OBJECT_PATH)
-    headers += align(4, len(headers))
-    headers += struct.pack('<I', len(path))
-    headers += path
-    headers.append(0)
-    headers += align(8, len(headers))
-
-    headers.append(HeaderField.MEMBER)
-    headers += encode_signature(DataType.STRING)
-    headers += align(4, len(headers))
-    headers += struct.pack('<I', len(member))
-    headers += member
-    headers.append(0)
-    headers += align(8, len(headers))
-
-    headers.append(HeaderField.SIGNATURE)
-    headers += encode_signature(DataType.SIGNATURE)
-    headers += struct.pack('B', len(signature))
-    headers += signature
-    headers.append(0)
-    headers += align(8, len(headers))
-
-    headers.append(HeaderField.UNIX_FDS)
-    headers += encode_signature(DataType.UINT32)
-    headers += align(4, len(headers))
-    headers += struct.pack('<I', num_fds)
-
-    body = bytearray()
-    body += struct.pack('<I', fd_index)
-
-    data = bytearray()
-    data.append(Endian.LITTLE)
-    data.append(MsgType.METHOD_CALL)
-    data.append(Flags.NONE)
-    data.append(Version.ONE)
-    data += struct.pack('<I', len(body))
-    data += struct.pack('<I', serial)
-    data += struct.pack('<I', len(headers))
-    data += headers
-    data += align(8, len(data))
-    data += body
+    path_off = 0
+    member_off = aligned(path_off + string_field_len(path), 8)
+    sig_off = aligned(member_off + string_field_len(member), 8)
+    # code + signature (4), length byte, signature, terminating nul
+    fds_off = aligned(sig_off + 4 + 1 + len(signature) + 1, 8)
+    # code + signature (4), uint32
+    headers_len = fds_off + 8
+
+    body_len = 4
+    body_off = 16 + aligned(headers_len, 8)
+
+    data = bytearray(body_off + body_len)
+    pack_message(data, body_len, serial, headers_len)
+    pack_string_field(data, 16 + path_off, PATH_FIELD, path)
+    pack_string_field(data, 16 + member_off, MEMBER_FIELD, member)
+
+    off = 16 + sig_off
+    data[off:off + 4] = SIGNATURE_FIELD
+    data[off + 4] = len(signature)
+    data[off + 5:off + 5 + len(signature)] = signature
+
+    off = 16 + fds_off
+    data[off:off + 4] = UNIX_FDS_FIELD
+    struct.pack_into('<I', data, off + 4, num_fds)
+
+    struct.pack_into('<I', data, body_off, fd_index)
 
     return bytes(data)
 
@@ -232,6 +249,41 @@ class ProtocolTester(unittest.TestCase):
         self.assertEqual(len(p.merrs), 0)
         self.assertEqual(len(p.msigs), 0)
 
+    def test_dataReceived_multiple_method_calls(self):
+        p = TestProtocol()
+        p._authenticated = True
+
+        data1 = create_basic_method('/test/path1', 'testMethod1')
+        data2 = create_basic_method('/test/path2', 'testMethod2')
+        data3 = create_basic_method('/test/path3', 'testMethod3')
+        data = data1 + data2 + data3
+
+        # two complete messages and the start of a third in one chunk
+        split = len(data1) + len(data2) + 5
+        self.assertIsNone(p.dataReceived(data[:split]))
+        self.assertEqual([m.member for m in p.mcalls],
+                         ['testMethod1', 'testMethod2'])
+
+        self.assertIsNone(p.dataReceived(data[split:]))
+        self.assertEqual([m.member for m in p.mcalls],
+                         ['testMethod1', 'testMethod2', 'testMethod3'])
+        self.assertEqual(p._buffer, b'')
+
+    def test_dataReceived_method_call_byte_by_byte(self):
+        p = TestProtocol()
+        p._authenticated = True
+
+        data = create_basic_method('/test/path', 'testMethod')
+
+        for i in range(len(data) - 1):
+            self.assertIsNone(p.dataReceived(data[i:i + 1]))
+        self.assertEqual(len(p.mcalls), 0)
+
+        self.assertIsNone(p.dataReceived(data[-1:]))
+        self.assertEqual(len(p.mcalls), 1)
+        self.assertEqual(p.mcalls[0].path, '/test/path')
+        self.assertEqual(p.mcalls[0].member, 'testMethod')
+
     def test_dataReceived_method_call_with_unix_fd(self):
         p = TestProtocol()
         p._authenticated = True
@@ -99,6 +99,12 @@ class BusNameValidationTester(unittest.TestCase):
     def test_7(self):
         self.t('foo.2bar')
 
+    def test_8(self):
+        self.assertEqual(marshal.validateBusName(':1.42'), None)
+
+    def test_9(self):
+        self.assertEqual(marshal.validateBusName('org.foo-bar.Baz'), None)
+
 
 class MemberNameValidationTester(unittest.TestCase):
 
@@ -120,3 +126,6 @@ class MemberNameValidationTester(unittest.TestCase):
 
     def test_4(self):
         self.t('foo.bar')
+
+    def test_5(self):
+        self.assertEqual(marshal.validateMemberName('f' * 255), None)
@@ -9,8 +9,14 @@ import getpass
 import hashlib
 import os
 import os.path
+import re
 import time
 
+try:
+    import pwd
+except ImportError:  # not available on all platforms
+    pwd = None
+
 from twisted.internet import interfaces
 from twisted.python import log
 from zope.interface import implementer, Interface
@@ -19,6 +25,29 @@ from txdbus.error import DBusAuthenticationFailed
 from txdbus.protocol import IDBusAuthenticator
 
 
+# One "<id> <creation time> <hex cookie>" entry of a DBus keyring file
+keyring_line_re = re.compile(
+    rb'^[ \t]*(\d+)[ \t]+(\d+)[ \t]+([0-9A-Fa-f]+)[ \t\r]*$', re.M)
+
+
+def _read_file(path):
+    """
+    Returns the full contents of the file at path. Keyring files are tiny so
+    this reads them with plain os.read calls rather than building a buffered
+    file object for each lookup.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+
+
 @implementer(IDBusAuthenticator)
 class ClientAuthenticator:
     """
@@ -36,7 +65,7 @@ class ClientAuthenticator:
         self.protocol = protocol
         self.unixFDSupport = self._usesUnixSocketTransport(self.protocol)
         self.guid = None
-        self.cookiedir = None  # used for testing only
+        self.cookie_dir = None  # used for testing only
 
         self.authOrder = self.preference[:]
         self.authOrder.reverse()
@@ -51,12 +80,8 @@ class ClientAuthenticator:
         )
 
     def handleAuthMessage(self, line):
-        if b' ' not in line:
-            cmd = line
-            args = b''
-        else:
-            cmd, args = line.split(b' ', 1)
-        m = getattr(self, '_auth_' + cmd.decode(), None)
+        cmd, _, args = line.partition(b' ')
+        m = getattr(self, '_auth_' + cmd.decode('ascii', 'replace'), None)
         if m:
             m(args)
         else:
@@ -148,9 +173,7 @@ class ClientAuthenticator:
                     cookie_id,
                 )
 
-                client_challenge = binascii.hexlify(
-                    hashlib.sha1(os.urandom(8)).digest()
-                )
+                client_challenge = binascii.hexlify(os.urandom(20))
 
                 response = b':'.join([
                     server_challenge,
@@ -198,22 +221,19 @@ class ClientAuthenticator:
                 'Aborting authentication',
             )
 
-        import pwd
-        if dstat.st_uid != pwd.getpwuid(os.geteuid()).pw_uid:
+        if dstat.st_uid != os.geteuid():
             raise Exception(
                 'Keyrings directory is not owned by the current user. '
                 'Aborting authentication!',
             )
 
         path = os.path.join(cookie_dir, cookie_context.decode('ascii'))
-        with open(path, 'rb') as f:
-            for line in f:
-                try:
-                    k_id, k_time, k_cookie_hex = line.split()
-                    if k_id == cookie_id:
-                        return k_cookie_hex
-                except BaseException:
-                    pass
+        data = _read_file(path)
+
+        for line in data.splitlines():
+            fields = line.split()
+            if len(fields) == 3 and fields[0] == cookie_id:
+                return fields[2]
 
 
 class IBusAuthenticationMechanism (Interface):
@@ -261,6 +281,8 @@ class BusCookieAuthenticator :
     def __init__(self):
         self.step_num = 0
         self.username = None
+        self.uid = None
+        self.gid = None
         self.cookieId = None
 
     def cancel(self):
@@ -294,10 +316,12 @@ class BusCookieAuthenticator :
             return ('REJECTED', None)
 
     def _step_one(self, username, keyring_dir=None):
+        if pwd is None:
+            return ('REJECTED', None)
+
         try:
             uid = int(username)
             try:
-                import pwd
                 username = pwd.getpwuid(uid).pw_name
             except BaseException:
                 return ('REJECTED', None)
@@ -307,12 +331,11 @@ class BusCookieAuthenticator :
         self.username = username
 
         try:
-            import pwd
             p = pwd.getpwnam(username)
             self.uid = p.pw_uid
             self.gid = p.pw_gid
             self.homedir = p.pw_dir
-        except (KeyError, ImportError):
+        except KeyError:
             return ('REJECTED', None)  # username not found
 
         if keyring_dir is None:
@@ -336,8 +359,7 @@ class BusCookieAuthenticator :
 
         self._create_cookie()
 
-        self.challenge_str = binascii.hexlify(hashlib.sha1(
-                                              os.urandom(8)).digest())
+        self.challenge_str = binascii.hexlify(os.urandom(20))
 
         msg = b' '.join([self.cookieContext.encode('ascii'),
                          str(self.cookieId).encode('ascii'),
@@ -403,18 +425,17 @@ class BusCookieAuthenticator :
         return lockfd
 
     def _get_cookies(self, timefunc=time.time):
-        cookies = []
         try:
-            with open(self.cookie_file, 'rb') as f:
-                for line in f:
-                    k_id, k_time, k_cookie_hex = line.split()
+            data = _read_file(self.cookie_file)
+        except OSError:
+            return []
 
-                    if abs(timefunc() - int(k_time)) < 30:
-                        cookies.append(line.split())
-        except BaseException:
-            pass
+        now = timefunc()
 
-        return cookies
+        return [
+            c for c in keyring_line_re.findall(data)
+            if abs(now - int(c[1])) < 30
+        ]
 
     def _create_cookie(self, timefunc=time.time):
 
@@ -435,14 +456,7 @@ class BusCookieAuthenticator :
             cookie,
         ))
 
-        for c in cookies:
-            os.write(lockfd, b' '.join(c) + b'\n')
-
-        os.close(lockfd)
-        if os.geteuid() == 0:
-            os.chown(self.lock_file, self.uid, self.gid)
-
-        os.rename(self.lock_file, self.cookie_file)
+        self._write_cookies(lockfd, cookies)
 
         self.cookieId = cookie_id
         self.cookie = cookie
@@ -462,14 +476,20 @@ class BusCookieAuthenticator :
             os.close(lockfd)
             os.unlink(self.lock_file)
         else:
-            for c in cookies:
-                os.write(lockfd, b' '.join(c) + b'\n')
+            self._write_cookies(lockfd, cookies)
 
-            os.close(lockfd)
-            if os.geteuid() == 0:
-                os.chown(self.lock_file, self.uid, self.gid)
+    def _write_cookies(self, lockfd, cookies):
+        """
+        Writes the keyring through the lock file with a single write and
+        then renames it over the cookie file
+        """
+        os.write(lockfd, b''.join(b' '.join(c) + b'\n' for c in cookies))
 
-            os.rename(self.lock_file, self.cookie_file)
+        os.close(lockfd)
+        if os.geteuid() == 0 and self.uid is not None:
+            os.chown(self.lock_file, self.uid, self.gid)
+
+        os.rename(self.lock_file, self.cookie_file)
 
 
 @implementer(IBusAuthenticationMechanism)
@@ -499,7 +519,6 @@ class BusExternalAuthenticator :
             return ('OK', None)
 
     def getUserName(self):
-        import pwd
         return pwd.getpwuid(self.creds[1]).pw_name
 
     def cancel(self):
@@ -548,7 +567,6 @@ class BusAuthenticator :
     def __init__(self, server_guid):
         self.server_guid = server_guid
         self.authenticated = False
-        self.mechanisms = {}
         self.protocol = None
         self.guid = None
 
@@ -556,12 +574,7 @@ class BusAuthenticator :
         self.state = None
         self.current_mech = None
 
-        for n, m in self.authenticators.items():
-            self.mechanisms[n] = m
-
-        mechNames = self.authenticators.keys()
-
-        self.reject_msg = b'REJECTED ' + b' '.join(mechNames)
+        self.reject_msg = b'REJECTED ' + b' '.join(self.authenticators)
 
     def beginAuthentication(self, protocol):
         self.protocol = protocol
@@ -569,12 +582,8 @@ class BusAuthenticator :
 
     def handleAuthMessage(self, line):
         # print 'RCV: ', line.rstrip()
-        if b' ' not in line:
-            cmd = line
-            args = b''
-        else:
-            cmd, args = line.split(b' ', 1)
-        m = getattr(self, '_auth_' + cmd.decode(), None)
+        cmd, _, args = line.partition(b' ')
+        m = getattr(self, '_auth_' + cmd.decode('ascii', 'replace'), None)
         if m:
             m(args)
         else:
@@ -644,8 +653,8 @@ class BusAuthenticator :
                 initial_response = None
                 if len(tpl) > 1:
                     initial_response = tpl[1]
-                if mech in self.mechanisms:
-                    m = self.mechanisms[mech]()
+                if mech in self.authenticators:
+                    m = self.authenticators[mech]()
                     self.current_mech = IBusAuthenticationMechanism(m)
                     self.current_mech.init(self.protocol)
                     self.stepAuth(initial_response)
@@ -4,8 +4,14 @@ DBus Bus implementation
 @author: Tom Cocagne
 """
 
-import binascii
-import os
+import re
+import secrets
+from collections import deque
+
+try:
+    import pwd
+except ImportError:  # not available on all platforms
+    pwd = None
 
 from twisted.python import log
 
@@ -15,6 +21,11 @@ from txdbus import marshal
 from txdbus.interface import DBusInterface, Method, Signal
 
 
+# key='value' pairs of a match rule and the argN / argNpath keys within them
+match_rule_re = re.compile(r"([A-Za-z0-9_]+)='([^']*)'")
+match_arg_re = re.compile(r'arg(\d+)(path)?$')
+
+
 class DError(Exception):
     """
     Used to signal anticipated errors
@@ -38,6 +49,7 @@ class BusProtocol (txdbus.protocol.BasicDBusProtocol):
     """
     _client = False
     _called_hello = False
+    _unixUid = None  # resolved on the first GetConnectionUnixUser call
     bus = None
     authenticator = authentication.BusAuthenticator
 
@@ -55,13 +67,19 @@ class BusProtocol (txdbus.protocol.BasicDBusProtocol):
             self.bus.clientDisconnected(self)
 
     def rawDBusMessageReceived(self, raw_msg):
-        msg = message.parseMessage(raw_msg)
-        mt = msg._messageType
+        msg = message.parseMessage(raw_msg, self._receivedFDs)
+
+        if hasattr(msg, 'unix_fds'):
+            self._receivedFDs = self._receivedFDs[msg.unix_fds:]
+
+        if self._called_hello:
+            self._forwardMessage(msg)
+            return
 
         if not self.uniqueName:
             self.bus.clientConnected(self)
 
-        if not self._called_hello and mt == 1:
+        if msg._messageType == 1:
             if msg.destination == 'org.freedesktop.DBus':
                 if msg.member == 'Hello':
 
@@ -79,10 +97,16 @@ class BusProtocol (txdbus.protocol.BasicDBusProtocol):
             else:
                 self.transport.loseConnection()
 
+        self._forwardMessage(msg)
+
+    def _forwardMessage(self, msg):
+        """
+        Stamps the sender onto a received message and hands it to the bus
+        """
         msg.sender = self.uniqueName
 
-        # re-marshal with the sender set and same serial number
-        msg._marshal(False)
+        # re-encode the header with the sender set, reusing the body
+        msg._remarshalHeader()
 
         self.bus.messageReceived(self, msg)
 
@@ -161,15 +185,23 @@ class Bus (objects.DBusObject):
 
     def __init__(self):
         objects.DBusObject.__init__(self, '/org/freedesktop/DBus')
-        self.uuid = binascii.hexlify(os.urandom(16))
+        self.uuid = secrets.token_hex(16)
         self.clients = {}  # maps unique_bus_id to client connection
-        self.busNames = {}  # maps name to list of queued connections
+        self.busNames = {}  # maps name to deque of queued connections
         self.router = router.MessageRouter()
         self.next_id = 1
         self.obj_handler = objects.DBusObjectHandler(self)
 
         self.obj_handler.exportObject(self)
 
+        # maps message types to their handlers
+        self._messageHandlers = {
+            1: self.methodCallReceived,
+            2: self.methodReturnReceived,
+            3: self.errorReceived,
+            4: self.signalReceived,
+        }
+
     # returns the new unique bus name for the client connection
     def clientConnected(self, proto):
         """
@@ -187,8 +219,20 @@ class Bus (objects.DBusObject):
         for rule_id in proto.matchRules:
             self.router.delMatch(rule_id)
 
-        for busName in proto.busNames.keys():
-            self.dbus_ReleaseName(busName, proto.uniqueName)
+        # Drop the connection from the queue of every name it owned or was
+        # waiting for, handing owned names on to the next queued connection
+        for busName in proto.busNames:
+            queue = self.busNames.get(busName)
+            if not queue or proto not in queue:
+                continue
+
+            wasOwner = queue[0] is proto
+            queue.remove(proto)
+
+            if not queue:
+                del self.busNames[busName]
+            elif wasOwner:
+                self.sendSignal(queue[0], 'NameAcquired', 's', busName)
 
         if proto.uniqueName:
             del self.clients[proto.uniqueName]
@@ -203,11 +247,13 @@ class Bus (objects.DBusObject):
         if msg._messageType in (1, 2):
             assert msg.destination, 'Failed to specify a message destination'
 
-        if msg.destination is not None:
-            if msg.destination[0] == ':':
-                p = self.clients.get(msg.destination, None)
+        dest = msg.destination
+
+        if dest is not None:
+            if dest[0] == ':':
+                p = self.clients.get(dest, None)
             else:
-                p = self.busNames.get(msg.destination, None)
+                p = self.busNames.get(dest, None)
                 if p:
                     p = p[0]
 
@@ -217,27 +263,19 @@ class Bus (objects.DBusObject):
             if p:
                 p.sendMessage(msg)
             else:
-                log.msg(
-                    'Invalid bus name in msg.destination: '
-                    + msg.destination
-                )
+                log.msg('Invalid bus name in msg.destination: ' + dest)
         else:
             self.router.routeMessage(msg)
 
     def messageReceived(self, p, msg):
-        mt = msg._messageType
+        handler = self._messageHandlers.get(msg._messageType)
 
-        # print 'MSG: ', mt, ' from ', p.uniqueName, ' to ', msg.destination
+        # print 'MSG: ', msg._messageType, ' from ', p.uniqueName, ' to ',
+        # msg.destination
 
         try:
-            if mt == 1:
-                self.methodCallReceived(p, msg)
-            elif mt == 2:
-                self.methodReturnReceived(p, msg)
-            elif mt == 3:
-                self.errorReceived(p, msg)
-            elif mt == 4:
-                self.signalReceived(p, msg)
+            if handler is not None:
+                handler(p, msg)
 
             if (
                     msg.destination
@@ -245,7 +283,10 @@ class Bus (objects.DBusObject):
             ):
                 self.sendMessage(msg)
 
-            self.router.routeMessage(msg)
+            # Method calls, returns and errors are unicast. Only signals and
+            # messages without a destination are matched against the rules
+            if msg._messageType == 4 or not msg.destination:
+                self.router.routeMessage(msg)
         except DError as e:
             sig = None
             body = None
@@ -391,7 +432,7 @@ class Bus (objects.DBusObject):
             )
 
         if name not in self.busNames:
-            self.busNames[name] = [caller, ]
+            self.busNames[name] = deque([caller])
             caller.busNames[name] = allow_replacement
 
             signalAcq('')
@@ -411,8 +452,7 @@ class Bus (objects.DBusObject):
                     return client.NAME_IN_USE
 
                 if owner.busNames[name]:
-                    del queue[0]
-                    queue.insert(0, caller)
+                    queue[0] = caller
                     del owner.busNames[name]
                     caller.busNames[name] = allow_replacement
                     self.sendSignal(owner, 'NameLost', 's', name)
@@ -440,7 +480,7 @@ class Bus (objects.DBusObject):
         if caller is not owner:
             return client.NAME_NOT_OWNER
 
-        del queue[0]
+        queue.popleft()
 
         if caller.isConnected:
             self.sendSignal(caller, 'NameLost', 's', name)
@@ -479,31 +519,38 @@ class Bus (objects.DBusObject):
             'arg0namespace': None,
         }
 
-        for item in rule.split(','):
-            k, v = item.split('=')
-
-            value = v[1:-1]
-
+        for k, value in match_rule_re.findall(rule):
             if k == 'type':
                 k = 'mtype'
 
             if k in kwargs:
                 kwargs[k] = value
+                continue
 
-            elif k.startswith('arg'):
-                if k.endswith('path'):
-                    if kwargs['arg_paths'] is None:
-                        kwargs['arg_paths'] = []
-                    kwargs['arg_paths'].append((int(k[3:-4]), value))
-                else:
-                    if kwargs['args'] is None:
-                        kwargs['args'] = []
-                    kwargs['args'].append((int(k[3:]), value))
+            m = match_arg_re.match(k)
+            if m is None:
+                continue
 
-        self.router.addMatch(caller.sendMessage, **kwargs)
+            if m.group(2):
+                if kwargs['arg_paths'] is None:
+                    kwargs['arg_paths'] = []
+                kwargs['arg_paths'].append((int(m.group(1)), value))
+            else:
+                if kwargs['args'] is None:
+                    kwargs['args'] = []
+                kwargs['args'].append((int(m.group(1)), value))
 
-    def dbus_GetNameOwner(self, busName):
-        if busName.startswith(':'):
+        rule_id = self.router.addMatch(caller.sendMessage, **kwargs)
+
+        # Recorded so that the rule is dropped when the client disconnects
+        caller.matchRules.add(rule_id)
+
+    def _resolveBusName(self, busName):
+        """
+        Returns the connection owning the unique or well-known busName or
+        raises a NameHasNoOwner L{DError} if there is none
+        """
+        if busName[:1] == ':':
             conn = self.clients.get(busName, None)
         else:
             conn = self.busNames.get(busName, None)
@@ -517,29 +564,23 @@ class Bus (objects.DBusObject):
                 (busName,),
             )
 
-        return conn.uniqueName
+        return conn
 
-    def dbus_GetConnectionUnixUser(self, busName):
-        if busName.startswith(':'):
-            conn = self.clients.get(busName, None)
-        else:
-            conn = self.busNames.get(busName, None)
-            if conn:
-                conn = conn[0]
+    def dbus_GetNameOwner(self, busName):
+        return self._resolveBusName(busName).uniqueName
 
-        if conn is None:
-            raise DError(
-                "org.freedesktop.DBus.Error.NameHasNoOwner",
-                "Could not get UID of name '%s': no such name" %
-                (busName,),
-            )
+    def dbus_GetConnectionUnixUser(self, busName):
+        conn = self._resolveBusName(busName)
+
+        if conn._unixUid is None:
+            try:
+                conn._unixUid = pwd.getpwnam(conn.username).pw_uid
+            except (AttributeError, KeyError, TypeError):
+                # No pwd module, unknown user or no user name at all
+                raise DError(
+                    'org.freedesktop.DBus.Error',
+                    "Unable to determine unix user for bus '%s'" %
+                    (busName,),
+                )
 
-        try:
-            import pwd
-            return pwd.getpwnam(conn.username).pw_uid
-        except BaseException:
-            raise DError(
-                'org.freedesktop.DBus.Error',
-                "Unable to determine unix user for bus '%s'" %
-                (busName,),
-            )
+        return conn._unixUid
@@ -6,7 +6,9 @@ methods over the DBus bus.
 @author: Tom Cocagne
 """
 
-from twisted.internet import defer, reactor
+from collections import deque
+
+from twisted.internet import defer
 from twisted.internet.error import ConnectError
 from twisted.internet.protocol import Factory
 
@@ -99,14 +101,15 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
         if self.busName is None:
             return
 
-        for cb in self._dcCallbacks:
+        for cb in tuple(self._dcCallbacks):
             cb(self, reason)
 
-        for d, timeout in self._pendingCalls.values():
+        pending, self._pendingCalls = self._pendingCalls, {}
+
+        for d, timeout in pending.values():
             if timeout:
                 timeout.cancel()
             d.errback(reason)
-        self._pendingCalls = {}
 
         self.objHandler.connectionLost(reason)
 
@@ -181,14 +184,7 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
         """
         rule = self.match_rules[rule_id]
 
-        d = self.callRemote(
-            '/org/freedesktop/DBus',
-            'RemoveMatch',
-            interface='org.freedesktop.DBus',
-            destination='org.freedesktop.DBus',
-            body=[rule],
-            signature='s',
-        )
+        d = self._callBus('RemoveMatch', 's', [rule])
 
         def ok(_):
             del self.match_rules[rule_id]
@@ -208,45 +204,41 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
         specification.  Refer to the \"Message Bus Message Routing\" section of
         the DBus specification for details.
 
+        The arg and arg_path arguments may be given either as a sequence of
+        (index, value) pairs or as a dictionary mapping index to value.
+
         @rtype: C{int}
         @returns: a L{Deferred} to an integer id that may be used to unregister
             the match rule
         """
 
-        l = []
+        if isinstance(arg, dict):
+            arg = sorted(arg.items())
 
-        def add(k, v):
-            if v is not None:
-                l.append(f"{k}='{v}'")
+        if isinstance(arg_path, dict):
+            arg_path = sorted(arg_path.items())
 
-        add('type', mtype)
-        add('sender', sender)
-        add('interface', interface)
-        add('member', member)
-        add('path', path)
-        add('path_namespace', path_namespace)
-        add('destination', destination)
+        fields = [
+            ('type', mtype),
+            ('sender', sender),
+            ('interface', interface),
+            ('member', member),
+            ('path', path),
+            ('path_namespace', path_namespace),
+            ('destination', destination),
+        ]
 
         if arg:
-            for idx, v in arg:
-                add('arg%d' % (idx,), v)
+            fields.extend(('arg%d' % (idx,), v) for idx, v in arg)
 
         if arg_path:
-            for idx, v in arg_path:
-                add('arg%dpath' % (idx,), v)
+            fields.extend(('arg%dpath' % (idx,), v) for idx, v in arg_path)
 
-        add('arg0namespace', arg0namespace)
+        fields.append(('arg0namespace', arg0namespace))
 
-        rule = ','.join(l)
+        rule = ','.join(f"{k}='{v}'" for k, v in fields if v is not None)
 
-        d = self.callRemote(
-            '/org/freedesktop/DBus',
-            'AddMatch',
-            interface='org.freedesktop.DBus',
-            destination='org.freedesktop.DBus',
-            body=[rule],
-            signature='s',
-        )
+        d = self._callBus('AddMatch', 's', [rule])
 
         def ok(_):
             rule_id = self.router.addMatch(
@@ -265,24 +257,30 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
             self.match_rules[rule_id] = rule
             return rule_id
 
-        d.addCallbacks(ok)
+        d.addCallback(ok)
 
         return d
 
-    def getNameOwner(self, busName):
+    def _callBus(self, methodName, signature, body):
         """
-        Calls org.freedesktop.DBus.GetNameOwner
-        @rtype: L{twisted.internet.defer.Deferred}
-        @returns: a Deferred to the unique connection name owning the bus name
+        Calls a method of the org.freedesktop.DBus interface on the bus itself
         """
-        d = self.callRemote(
+        return self.callRemote(
             '/org/freedesktop/DBus',
-            'GetNameOwner',
+            methodName,
             interface='org.freedesktop.DBus',
-            signature='s',
-            body=[busName],
             destination='org.freedesktop.DBus',
+            signature=signature,
+            body=body,
         )
+
+    def getNameOwner(self, busName):
+        """
+        Calls org.freedesktop.DBus.GetNameOwner
+        @rtype: L{twisted.internet.defer.Deferred}
+        @returns: a Deferred to the unique connection name owning the bus name
+        """
+        d = self._callBus('GetNameOwner', 's', [busName])
         return d
 
     def getConnectionUnixUser(self, busName):
@@ -291,14 +289,7 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
         @rtype: L{twisted.internet.defer.Deferred}
         @returns: a Deferred to the integer unix user id
         """
-        d = self.callRemote(
-            '/org/freedesktop/DBus',
-            'GetConnectionUnixUser',
-            interface='org.freedesktop.DBus',
-            signature='s',
-            body=[busName],
-            destination='org.freedesktop.DBus',
-        )
+        d = self._callBus('GetConnectionUnixUser', 's', [busName])
 
         return d
 
@@ -309,14 +300,7 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
         @returns: a Deferred to a list of unique bus names for connections
             queued for the name
         """
-        d = self.callRemote(
-            '/org/freedesktop/DBus',
-            'ListQueuedOwners',
-            interface='org.freedesktop.DBus',
-            signature='s',
-            body=[busName],
-            destination='org.freedesktop.DBus',
-        )
+        d = self._callBus('ListQueuedOwners', 's', [busName])
 
         return d
 
@@ -327,14 +311,7 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
         @returns: a Deferred to an integer constant which will be one of
                   NAME_RELEASED, NAME_NON_EXISTENT, NAME_NOT_OWNER
         """
-        d = self.callRemote(
-            '/org/freedesktop/DBus',
-            'ReleaseName',
-            interface='org.freedesktop.DBus',
-            signature='s',
-            body=[busName],
-            destination='org.freedesktop.DBus',
-        )
+        d = self._callBus('ReleaseName', 's', [busName])
         return d
 
     def requestBusName(self, newName,
@@ -382,22 +359,15 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
         if doNotQueue:
             flags |= 0x4
 
-        d = self.callRemote(
-            '/org/freedesktop/DBus',
-            'RequestName',
-            interface='org.freedesktop.DBus',
-            signature='su',
-            body=[newName, flags],
-            destination='org.freedesktop.DBus',
-        )
+        d = self._callBus('RequestName', 'su', [newName, flags])
 
-        def on_result(r):
-            if errbackUnlessAcquired and not (
-                    r == NAME_ACQUIRED or r == NAME_ALREADY_OWNER):
-                raise error.FailedToAcquireName(newName, r)
-            return r
+        if errbackUnlessAcquired:
+            def on_result(r):
+                if not (r == NAME_ACQUIRED or r == NAME_ALREADY_OWNER):
+                    raise error.FailedToAcquireName(newName, r)
+                return r
 
-        d.addCallback(on_result)
+            d.addCallback(on_result)
 
         return d
 
@@ -466,18 +436,15 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
                         'Unexpected return value signature: %s' %
                         (msg,))
 
-        if msg.body is None or len(msg.body) == 0:
+        body = msg.body
+
+        if not body:
             return None
 
-        # if not (
-        #     isinstance(msg.body[0], six.string_types) and
-        #     msg.body[0].startswith('<!D')
-        # ):
-        #     print('RET SIG', msg.signature, 'BODY:', msg.body)
-        if len(msg.body) == 1 and not msg.signature[0] == '(':
-            return msg.body[0]
+        if len(body) == 1 and msg.signature[0] != '(':
+            return body[0]
         else:
-            return msg.body
+            return body
 
     def callRemote(self, objectPath, methodName,
                    interface=None,
@@ -559,7 +526,10 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
 
             d = self.callRemoteMessage(mcall, timeout)
 
-            d.addCallback(self._cbCvtReply, returnSignature)
+            # Calls without a reply fire immediately with None, which needs
+            # no conversion
+            if expectReply:
+                d.addCallback(self._cbCvtReply, returnSignature)
 
             return d
         except Exception:
@@ -569,8 +539,8 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
         """
         Called when a remote method invocation timeout occurs
         """
-        del self._pendingCalls[serial]
-        d.errback(error.TimeOut('Method call timed out'))
+        if self._pendingCalls.pop(serial, None) is not None:
+            d.errback(error.TimeOut('Method call timed out'))
 
     def callRemoteMessage(self, mcall, timeout=None):
         """
@@ -585,6 +555,9 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
             d = defer.Deferred()
 
             if timeout:
+                reactor = getattr(self.factory, 'reactor', None)
+                if reactor is None:
+                    from twisted.internet import reactor
                 timeout = reactor.callLater(
                     timeout, self._onMethodTimeout, mcall.serial, d)
 
@@ -604,26 +577,30 @@ class DBusClientConnection (txdbus.protocol.BasicDBusProtocol):
         """
         self.objHandler.handleMethodCallMessage(mcall)
 
-    def methodReturnReceived(self, mret):
+    def _completePending(self, serial):
         """
-        Called when a method return message is received
+        Removes the pending call for the specified serial number, cancels its
+        timeout, and returns its Deferred. Returns None if no call is pending
         """
-        d, timeout = self._pendingCalls.get(mret.reply_serial, (None, None))
+        d, timeout = self._pendingCalls.pop(serial, (None, None))
         if timeout:
             timeout.cancel()
+        return d
+
+    def methodReturnReceived(self, mret):
+        """
+        Called when a method return message is received
+        """
+        d = self._completePending(mret.reply_serial)
         if d:
-            del self._pendingCalls[mret.reply_serial]
             d.callback(mret)
 
     def errorReceived(self, merr):
         """
         Called when an error message is received
         """
-        d, timeout = self._pendingCalls.get(merr.reply_serial, (None, None))
-        if timeout:
-            timeout.cancel()
+        d = self._completePending(merr.reply_serial)
         if d:
-            del self._pendingCalls[merr.reply_serial]
             e = error.RemoteError(merr.error_name)
             e.message = ''
             e.values = []
@@ -646,6 +623,10 @@ class DBusClientFactory (Factory):
     """
     protocol = DBusClientConnection
 
+    # Reactor used for method call timeouts. Set by L{connect}; the global
+    # reactor is used if left as None.
+    reactor = None
+
     def __init__(self):
         self.d = defer.Deferred()
 
@@ -689,16 +670,15 @@ def connect(reactor, busAddress='session'):
     from txdbus import endpoints
 
     f = DBusClientFactory()
+    f.reactor = reactor
 
     d = f.getConnection()
 
-    eplist = endpoints.getDBusEndpoints(reactor, busAddress)
-
-    eplist.reverse()
+    eplist = deque(endpoints.getDBusEndpoints(reactor, busAddress))
 
     def try_next_ep(err):
         if eplist:
-            eplist.pop().connect(f).addErrback(try_next_ep)
+            eplist.popleft().connect(f).addErrback(try_next_ep)
         else:
             d.errback(
                 ConnectError(
@@ -4,6 +4,7 @@ Endpoint creation from DBus address strings
 @author: Tom Cocagne
 """
 import os
+import re
 
 from twisted.internet.endpoints import (
     TCP4ClientEndpoint,
@@ -13,6 +14,11 @@ from twisted.internet.endpoints import (
 )
 
 
+# "<transport>:<key>=<value>,..." for a single entry of a bus address
+address_re = re.compile(r'(unix|tcp|nonce-tcp|launchd):(.*)', re.S)
+keyval_re = re.compile(r'([^,=]+)=([^,]*)')
+
+
 def getDBusEnvEndpoints(reactor, client=True):
     """
     Creates endpoints from the DBUS_SESSION_BUS_ADDRESS environment variable
@@ -63,28 +69,18 @@ def getDBusEndpoints(reactor, busAddress, client=True):
     epl = []
 
     for ep_addr in addrString.split(';'):
-        d = {}
-        kind = None
         ep = None
 
-        for c in ep_addr.split(','):
-            if c.startswith('unix:'):
-                kind = 'unix'
-                c = c[5:]
-            elif c.startswith('tcp:'):
-                kind = 'tcp'
-                c = c[4:]
-            elif c.startswith('nonce-tcp:'):
-                kind = 'tcp'
-                c = c[10:]
-                d['nonce-tcp'] = True
-            elif c.startswith('launchd:'):
-                kind = 'launchd'
-                c = c[7:]
-
-            if '=' in c:
-                k, v = c.split('=')
-                d[k] = v
+        m = address_re.match(ep_addr)
+        if m is None:
+            continue
+
+        kind = m.group(1)
+        d = dict(keyval_re.findall(m.group(2)))
+
+        if kind == 'nonce-tcp':
+            kind = 'tcp'
+            d['nonce-tcp'] = True
 
         if kind == 'unix':
             if 'path' in d:
@@ -17,6 +17,19 @@ bus_re = re.compile(r'[^A-Za-z0-9_.\-:]')
 mbr_re = re.compile('[^A-Za-z0-9_]')
 dot_digit_re = re.compile(r'\.\d')
 
+# Full-match patterns for well-formed names. Valid input is accepted with a
+# single match; anything else falls through to the checks below, which
+# produce the descriptive error messages.
+valid_obj_path_re = re.compile(r'/|(?:/[A-Za-z0-9_]+)+')
+valid_if_re = re.compile(
+    r'[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)+'
+)
+valid_bus_re = re.compile(
+    r':[A-Za-z0-9_\-]+(?:\.[A-Za-z0-9_\-]+)+'
+    r'|[A-Za-z_\-][A-Za-z0-9_\-]*(?:\.[A-Za-z_\-][A-Za-z0-9_\-]*)+'
+)
+valid_mbr_re = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
 
 #                Name      Type code   Alignment
 dbus_types = [('BYTE', 'y', 1),
@@ -141,6 +154,8 @@ def validateObjectPath(p):
     @type p: C{string}
     @param p: A DBus object path
     """
+    if valid_obj_path_re.fullmatch(p):
+        return
     if not p.startswith('/'):
         raise MarshallingError('Object paths must begin with a "/"')
     if len(p) > 1 and p[-1] == '/':
@@ -159,13 +174,15 @@ def validateInterfaceName(n):
     @type n: C{string}
     @param n: A DBus interface name
     """
+    if len(n) <= 255 and valid_if_re.fullmatch(n):
+        return
     try:
+        if len(n) > 255:
+            raise Exception('Name exceeds maximum length of 255')
         if '.' not in n:
             raise Exception('At least two components required')
         if '..' in n:
             raise Exception('".." not allowed in interface names')
-        if len(n) > 255:
-            raise Exception('Name exceeds maximum length of 255')
         if n[0] == '.':
             raise Exception('Names may not begin with a "."')
         if n[0].isdigit():
@@ -195,13 +212,15 @@ def validateBusName(n):
     @type n: C{string}
     @param n: A DBus bus name
     """
+    if len(n) <= 255 and valid_bus_re.fullmatch(n):
+        return
     try:
+        if len(n) > 255:
+            raise Exception('Name exceeds maximum length of 255')
         if '.' not in n:
             raise Exception('At least two components required')
         if '..' in n:
             raise Exception('".." not allowed in bus names')
-        if len(n) > 255:
-            raise Exception('Name exceeds maximum length of 255')
         if n[0] == '.':
             raise Exception('Names may not begin with a "."')
         if n[0].isdigit():
@@ -224,6 +243,8 @@ def validateMemberName(n):
     @type n: C{string}
     @param n: A DBus member name
     """
+    if len(n) <= 255 and valid_mbr_re.fullmatch(n):
+        return
     try:
         if len(n) < 1:
             raise Exception('Name must be at least one byte in length')
@@ -266,7 +287,7 @@ def sigFromPy(pobj):
         return 'd'
     elif isinstance(pobj, str):
         return 's'
-    elif isinstance(pobj, bytearray):
+    elif isinstance(pobj, (bytes, bytearray)):
         return 'ay'
 
     elif isinstance(pobj, list):
@@ -516,6 +537,14 @@ def marshal_array(ct, var, start_byte, lendian, oobFDs):
     tsig = ct[1:]   # strip of leading 'a'
     tcode = tsig[0]  # type of array element
 
+    if tcode == 'y' and isinstance(var, (bytes, bytearray)):
+        # Byte arrays need no per-element padding or conversion so the
+        # buffer may be used as-is rather than being packed byte by byte
+        return 4 + len(var), [
+            struct.pack(lendian and '<I' or '>I', len(var)),
+            var,
+        ]
+
     start_byte += 4  # for array size
 
     initial_padding = pad[tcode](start_byte)
@@ -524,13 +553,14 @@ def marshal_array(ct, var, start_byte, lendian, oobFDs):
         start_byte += len(initial_padding)
         chunks.append(initial_padding)
 
-    if isinstance(var, (list, tuple, bytearray)):
+    if isinstance(var, (list, tuple, bytes, bytearray)):
         arr_list = var
     elif isinstance(var, dict):
         arr_list = [tpl for tpl in var.items()]
     else:
         raise MarshallingError(
-            'List, Tuple, Bytearray, or Dictionary required for DBus array. '
+            'List, Tuple, Bytes, Bytearray, or Dictionary required for DBus '
+            'array. '
             ' Received: ' + repr(var)
         )
 
@@ -105,6 +105,33 @@ class DBusMessage :
         else:
             binBody = b''
 
+        if newSerial:
+            self.serial = DBusMessage._nextSerial
+
+            DBusMessage._nextSerial += 1
+
+        self._marshalHeader(self.endian, flags, _headerAttrs, binBody)
+
+    def _remarshalHeader(self):
+        """
+        Re-encodes the header of a parsed message, typically after the bus has
+        set the sender, and reuses the already marshalled body. The body always
+        starts on an 8-byte boundary so its encoding does not depend on the
+        length of the header. The original endianness, flags and serial number
+        are kept.
+        """
+        self._marshalHeader(
+            self.rawHeader[0],
+            self.rawHeader[2],
+            self._headerAttrs,
+            self.rawBody,
+        )
+
+    def _marshalHeader(self, endian, flags, _headerAttrs, binBody):
+        """
+        Encodes the header fields and joins them with the marshalled body to
+        form C{self.rawMessage}
+        """
         self.headers = []
 
         for attr_name, code, _ in _headerAttrs:
@@ -122,15 +149,10 @@ class DBusMessage :
 
         self.bodyLength = len(binBody)
 
-        if newSerial:
-            self.serial = DBusMessage._nextSerial
-
-            DBusMessage._nextSerial += 1
-
         binHeader = b''.join(marshal.marshal(
             _headerFormat,
             [
-                self.endian,
+                endian,
                 self._messageType,
                 flags,
                 self._protocolVersion,
@@ -138,7 +160,7 @@ class DBusMessage :
                 self.serial,
                 self.headers
             ],
-            lendian=self.endian == ord('l')
+            lendian=endian == ord('l')
         )[1])
 
         headerPadding = marshal.pad['header'](len(binHeader))
@@ -69,8 +69,6 @@ class BasicDBusProtocol(protocol.Protocol):
     _buffer = b''
     _receivedFDs = None
     _authenticated = False
-    _nextMsgLen = 0
-    _endian = '<'
     _client = True
     _firstByte = True
     _unix_creds = None  # (pid, uid, gid) from UnixSocket credential passing
@@ -97,50 +95,48 @@ class BasicDBusProtocol(protocol.Protocol):
             self._dbusAuth = IDBusAuthenticator(self.authenticator())
         else:
             self._dbusAuth = IDBusAuthenticator(self.authenticator(
-                self.factory.bus.uuid))
+                self.factory.bus.uuid.encode('ascii')))
         self._dbusAuth.beginAuthentication(self)
 
     def dataReceived(self, data):
 
         if self._authenticated:
-            self._buffer = self._buffer + data
-            buffer_len = len(self._buffer)
-
-            if self._nextMsgLen == 0 and buffer_len >= 16:
-                # There would be multiple clients using different endians.
-                # Reset endian every time.
-                if self._buffer[:1] != b'l':
-                    self._endian = '>'
-                else:
-                    self._endian = '<'
-
-                body_len = struct.unpack(
-                    self._endian + 'I', self._buffer[4:8])[0]
-                harr_len = struct.unpack(
-                    self._endian + 'I', self._buffer[12:16])[0]
-
-                hlen = self.MSG_HDR_LEN + harr_len
-
-                padlen = hlen % 8 and (8 - hlen % 8) or 0
-
-                self._nextMsgLen = (
-                    self.MSG_HDR_LEN
-                    + harr_len
-                    + padlen
-                    + body_len
-                )
-
-            if self._nextMsgLen != 0 and buffer_len >= self._nextMsgLen:
-                raw_msg = self._buffer[:self._nextMsgLen]
-                self._buffer = self._buffer[self._nextMsgLen:]
-
-                self._nextMsgLen = 0
-
-                self.rawDBusMessageReceived(raw_msg)
-
-                if self._buffer:
-                    # Recursively process any other complete messages
-                    self.dataReceived(b'')
+            buf = self._buffer + data
+            buffer_len = len(buf)
+            offset = 0
+            unpack_from = struct.unpack_from
+            dispatch = self.rawDBusMessageReceived
+
+            # Every complete message in the buffer is dispatched by walking
+            # an offset through it. The unconsumed tail is stored once, at
+            # the end, rather than re-slicing the buffer for each message.
+            try:
+                while buffer_len - offset >= 16:
+                    # There would be multiple clients using different
+                    # endians. Determine endian for every message.
+                    if buf[offset:offset + 1] != b'l':
+                        endian = '>I'
+                    else:
+                        endian = '<I'
+
+                    body_len = unpack_from(endian, buf, offset + 4)[0]
+                    harr_len = unpack_from(endian, buf, offset + 12)[0]
+
+                    hlen = self.MSG_HDR_LEN + harr_len
+
+                    padlen = hlen % 8 and (8 - hlen % 8) or 0
+
+                    msg_len = hlen + padlen + body_len
+
+                    if buffer_len - offset < msg_len:
+                        break
+
+                    raw_msg = buf[offset:offset + msg_len]
+                    offset += msg_len
+
+                    dispatch(raw_msg)
+            finally:
+                self._buffer = buf[offset:] if offset else buf
         else:
             if not self._client and self._firstByte:
                 if data[0] != 0: